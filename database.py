@@ -5,11 +5,13 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, WriteConcern
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import Iterable, List, Optional, Union
+from itertools import islice
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -17,6 +19,8 @@ load_dotenv()
 
 _client = None
 db = None
+# Whether the startup ping succeeded; lets startup work skip an unreachable server without waiting again
+db_reachable = False
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
@@ -24,10 +28,20 @@ database_name = os.getenv("DATABASE_NAME")
 # Initialize client gracefully to avoid crashing server if SRV or network issues
 try:
     if database_url and database_name:
-        _client = MongoClient(database_url, serverSelectionTimeoutMS=3000)
+        # One pooled client for the whole process; zstd (zlib fallback) compresses large result payloads
+        _client = MongoClient(
+            database_url,
+            serverSelectionTimeoutMS=3000,
+            maxPoolSize=100,
+            minPoolSize=10,
+            maxIdleTimeMS=60000,
+            compressors="zstd,zlib",
+            retryWrites=True,
+        )
         # Trigger a lightweight server selection to validate DNS/SRV without blocking startup
         try:
             _client.admin.command('ping')
+            db_reachable = True
         except Exception:
             # It's okay if ping fails at startup; we'll keep db None if it can't be reached
             pass
@@ -57,6 +71,73 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     return str(result.inserted_id)
 
 
+def get_or_create_document(collection_name: str, filter_dict: dict, data: Union[BaseModel, dict]) -> str:
+    """Return the _id of the document matching filter_dict, inserting data (with timestamps) if none exists"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+    # Filter fields are copied into the new document by the upsert itself
+    for key in filter_dict:
+        data_dict.pop(key, None)
+    data_dict['created_at'] = datetime.now(timezone.utc)
+    data_dict['updated_at'] = datetime.now(timezone.utc)
+
+    doc = db[collection_name].find_one_and_update(
+        filter_dict,
+        {"$setOnInsert": data_dict},
+        projection={"_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return str(doc["_id"])
+
+
+def bulk_create(
+    collection_name: str,
+    items: Iterable[Union[BaseModel, dict]],
+    batch_size: int = 1000,
+    write_concern: Optional[WriteConcern] = None,
+    inserted_ids: Optional[List[str]] = None,
+) -> List[str]:
+    """Insert many documents with timestamps, batching them into insert_many calls.
+
+    Pass an inserted_ids list to have ids appended as each batch is written, so a caller
+    can still tell what was committed when a later batch or the item iterator fails.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    collection = db[collection_name]
+    if write_concern is not None:
+        collection = collection.with_options(write_concern=write_concern)
+
+    if inserted_ids is None:
+        inserted_ids = []
+    it = iter(items)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            break
+        now = datetime.now(timezone.utc)
+        docs = []
+        for data in batch:
+            data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+            data_dict['created_at'] = now
+            data_dict['updated_at'] = now
+            docs.append(data_dict)
+        # ordered=False lets the server apply the whole batch without stopping at the first error
+        try:
+            result = collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # insert_many assigns _id to each doc in place; keep the ones the server accepted
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            inserted_ids.extend(str(d["_id"]) for i, d in enumerate(docs) if i not in failed and "_id" in d)
+            raise
+        inserted_ids.extend(str(_id) for _id in result.inserted_ids)
+    return inserted_ids
+
+
 def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
     """Get documents from collection"""
     if db is None:
@@ -1,18 +1,38 @@
 import os
 from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, BinaryIO, Callable, Iterable, Iterator, Literal
 from bson import ObjectId
+from pymongo import WriteConcern, IndexModel, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure, PyMongoError
 import io
-import json
+import logging
+import orjson
 import csv
+import functools
+import re
+import shutil
+import time
 from datetime import datetime
 
-from database import db, create_document, get_documents
+try:
+    import ijson  # type: ignore
+except Exception:
+    # Fall back to loading JSON uploads in one piece
+    ijson = None
+
+from database import db, db_reachable, get_documents, bulk_create, get_or_create_document
 from schemas import Photo, Catalog
 
-app = FastAPI(title="Photo Search API")
+logger = logging.getLogger(__name__)
+
+# What a malformed upload can raise while it is parsed; pydantic's ValidationError, orjson's
+# JSONDecodeError and UnicodeDecodeError are all ValueErrors
+UPLOAD_PARSE_ERRORS: tuple = (ValueError, csv.Error) + ((ijson.JSONError,) if ijson is not None else ())
+
+app = FastAPI(title="Photo Search API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -57,7 +77,30 @@ def test_database():
     response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
     return response
 
+# -------- Facet cache --------
+
+# Facets only change when photos are ingested, so serve them from memory between ingests
+FACET_CACHE_TTL = 60.0
+# "gen" is bumped on every invalidation so an aggregate that started before an ingest can't cache its result
+_facet_cache: Dict[str, Any] = {"ts": 0.0, "data": None, "gen": 0}
+
+
+def _invalidate_facets() -> None:
+    _facet_cache["gen"] += 1
+    _facet_cache["data"] = None
+
+# -------- Catalogs --------
+
+@functools.lru_cache(maxsize=1024)
+def _catalog_id_for(name: str, source: str) -> str:
+    # Catalogs are never renamed or deleted by the API, so the name -> id mapping is stable per process
+    return get_or_create_document("catalog", {"name": name}, Catalog(name=name, source=source))
+
 # -------- Ingest endpoints --------
+
+# Catalog data can always be re-ingested, so bulk writes skip the journal and replica acks
+INGEST_WRITE_CONCERN = WriteConcern(w=1, j=False)
+
 class PhotoIngest(BaseModel):
     catalog: Optional[str] = None
     source: Optional[str] = "lightroom"
@@ -68,19 +111,21 @@ def ingest_photos(payload: PhotoIngest):
     # Ensure catalog exists (simple by name)
     catalog_id: Optional[str] = None
     if payload.catalog:
-        existing = db["catalog"].find_one({"name": payload.catalog})
-        if existing:
-            catalog_id = str(existing.get("_id"))
-        else:
-            catalog_id = create_document("catalog", Catalog(name=payload.catalog, source=payload.source))
+        catalog_id = _catalog_id_for(payload.catalog, payload.source or "lightroom")
 
-    inserted_ids: List[str] = []
+    # Items were already validated by FastAPI; _photo_doc adds the derived search fields
+    docs: List[Dict[str, Any]] = []
     for item in payload.items:
         data = item.model_dump()
         if catalog_id and not data.get("catalog_id"):
             data["catalog_id"] = catalog_id
-        new_id = create_document("photo", data)
-        inserted_ids.append(new_id)
+        data["keywords"] = _parse_kws(data.get("keywords"))
+        docs.append(_photo_doc(**data))
+    try:
+        inserted_ids = bulk_create("photo", docs, write_concern=INGEST_WRITE_CONCERN)
+    finally:
+        # An unordered batch can partly succeed before raising
+        _invalidate_facets()
     return {"inserted": len(inserted_ids), "ids": inserted_ids}
 
 
@@ -97,6 +142,29 @@ def _coerce_bool(val: Any) -> Optional[bool]:
     return None
 
 
+def _parse_kws(val: Any, separators: str = ",") -> List[str]:
+    if isinstance(val, str):
+        for sep in separators[1:]:
+            val = val.replace(sep, separators[0])
+        parts = val.split(separators[0])
+    elif isinstance(val, list):
+        parts = val
+    else:
+        return []
+    # Non-string list elements (e.g. JSON null) are dropped rather than stored as "none"
+    return [p.strip() for p in parts if isinstance(p, str) and p.strip()]
+
+
+def _keywords_lc(keywords: Optional[List[str]]) -> List[str]:
+    # Stored alongside keywords so #tag searches are exact multikey index matches
+    return [k.lower() for k in keywords or [] if isinstance(k, str)]
+
+
+def _label_lc(label: Optional[str]) -> Optional[str]:
+    # Stored alongside label so the label filter is an indexed equality match
+    return (label or "").strip().lower() or None
+
+
 def _coerce_int(val: Any) -> Optional[int]:
     try:
         return int(val) if val not in (None, "") else None
@@ -104,6 +172,12 @@ def _coerce_int(val: Any) -> Optional[int]:
         return None
 
 
+def _coerce_rating(val: Any) -> Optional[int]:
+    # Same 0-5 range Photo enforces; out-of-range values are dropped rather than stored
+    rating = _coerce_int(val)
+    return rating if rating is not None and 0 <= rating <= 5 else None
+
+
 def _coerce_float(val: Any) -> Optional[float]:
     try:
         return float(val) if val not in (None, "") else None
@@ -111,16 +185,10 @@ def _coerce_float(val: Any) -> Optional[float]:
         return None
 
 
-def _parse_date(val: Any) -> Optional[datetime]:
-    if not val:
-        return None
-    if isinstance(val, datetime):
-        return val
-    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%m/%d/%Y", "%m/%d/%Y %H:%M:%S"):
-        try:
-            return datetime.strptime(str(val), fmt)
-        except Exception:
-            continue
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%m/%d/%Y", "%m/%d/%Y %H:%M:%S")
+
+
+def _parse_epoch(val: Any) -> Optional[datetime]:
     # Lightroom captureTime is seconds since 1/1/2001 sometimes; handle epoch-ish numbers
     try:
         num = float(val)
@@ -132,127 +200,306 @@ def _parse_date(val: Any) -> Optional[datetime]:
     return None
 
 
+def _make_date_parser() -> Callable[[Any], Optional[datetime]]:
+    """Build a date parser that remembers which strptime format last matched and tries it first"""
+    last_fmt: List[Optional[str]] = [None]
+
+    def parse(val: Any) -> Optional[datetime]:
+        if not val:
+            return None
+        if isinstance(val, datetime):
+            return val
+        if isinstance(val, (int, float)):
+            return _parse_epoch(val)
+        s = str(val)
+        # fromisoformat is implemented in C and covers the year-first formats
+        if len(s) >= 10 and s[4] in "-/":
+            try:
+                return datetime.fromisoformat(s.replace("/", "-"))
+            except ValueError:
+                pass
+        hint = last_fmt[0]
+        if hint:
+            try:
+                return datetime.strptime(s, hint)
+            except ValueError:
+                pass
+        for fmt in _DATE_FORMATS:
+            if fmt == hint:
+                continue
+            try:
+                parsed = datetime.strptime(s, fmt)
+            except ValueError:
+                continue
+            last_fmt[0] = fmt
+            return parsed
+        return _parse_epoch(s)
+
+    return parse
+
+
+DateParsers = Dict[str, Callable[[Any], Optional[datetime]]]
+
+
+def _date_parsers() -> DateParsers:
+    """One parser per date field, built per ingest so each format hint only sees its own column"""
+    return {"capture_date": _make_date_parser(), "import_date": _make_date_parser()}
+
+
+def _photo_doc(**fields: Any) -> Dict[str, Any]:
+    """Build a photo document shaped like Photo.model_dump() without constructing the model"""
+    doc: Dict[str, Any] = {
+        "filename": "",
+        "path": None,
+        "catalog_id": None,
+        "title": None,
+        "caption": None,
+        "keywords": [],
+        "rating": None,
+        "label": None,
+        "flagged": False,
+        "capture_date": None,
+        "import_date": None,
+        "width": None,
+        "height": None,
+        "exif": {"camera": None, "lens": None, "iso": None, "shutter": None, "aperture": None, "focal_length": None},
+        "thumbnail_url": None,
+        "extra": {},
+    }
+    doc.update(fields)
+    # Derived search fields
+    doc["label_lc"] = _label_lc(doc["label"])
+    doc["keywords_lc"] = _keywords_lc(doc["keywords"])
+    if doc["import_date"] is None:
+        doc["import_date"] = datetime.utcnow()
+    return doc
+
+
+def _json_record_to_doc(rec: Dict[str, Any], catalog_id: Optional[str], dates: DateParsers) -> Dict[str, Any]:
+    exif = rec.get("exif")
+    if not isinstance(exif, dict):
+        exif = {}
+    return _photo_doc(
+        filename=rec.get("filename") or rec.get("name") or "",
+        path=rec.get("path"),
+        catalog_id=rec.get("catalog_id") or catalog_id,
+        title=rec.get("title"),
+        caption=rec.get("caption"),
+        # keywords may be comma-separated string
+        keywords=_parse_kws(rec.get("keywords")),
+        rating=_coerce_rating(rec.get("rating")),
+        label=rec.get("label"),
+        flagged=_coerce_bool(rec.get("flagged")) or False,
+        capture_date=dates["capture_date"](rec.get("capture_date")),
+        import_date=dates["import_date"](rec.get("import_date")),
+        width=_coerce_int(rec.get("width")),
+        height=_coerce_int(rec.get("height")),
+        exif={
+            "camera": exif.get("camera"),
+            "lens": exif.get("lens"),
+            "iso": _coerce_int(exif.get("iso")),
+            "shutter": exif.get("shutter"),
+            "aperture": _coerce_float(exif.get("aperture")),
+            "focal_length": _coerce_float(exif.get("focal_length")),
+        },
+        thumbnail_url=rec.get("thumbnail_url"),
+        extra=rec.get("extra") or {},
+    )
+
+
+def _csv_row_to_doc(row: Dict[str, Any], catalog_id: Optional[str], dates: DateParsers) -> Dict[str, Any]:
+    return _photo_doc(
+        filename=row.get("filename") or row.get("name") or row.get("FileName") or "",
+        path=row.get("path") or row.get("Path"),
+        catalog_id=catalog_id,
+        title=row.get("title") or row.get("Title"),
+        caption=row.get("caption") or row.get("Caption"),
+        keywords=_parse_kws(row.get("keywords") or row.get("Tags"), ",;"),
+        rating=_coerce_rating(row.get("rating") or row.get("Rating")),
+        label=row.get("label") or row.get("Label"),
+        flagged=_coerce_bool(row.get("flagged") or row.get("Flagged")) or False,
+        capture_date=dates["capture_date"](row.get("capture_date") or row.get("CaptureDate")),
+        import_date=dates["import_date"](row.get("import_date") or row.get("ImportDate")),
+        width=_coerce_int(row.get("width") or row.get("Width")),
+        height=_coerce_int(row.get("height") or row.get("Height")),
+        exif={
+            "camera": row.get("camera") or row.get("Camera"),
+            "lens": row.get("lens") or row.get("Lens"),
+            "iso": _coerce_int(row.get("iso") or row.get("ISO")),
+            "shutter": row.get("shutter") or row.get("Shutter"),
+            "aperture": _coerce_float(row.get("aperture") or row.get("Aperture")),
+            "focal_length": _coerce_float(row.get("focal_length") or row.get("FocalLength")),
+        },
+        thumbnail_url=row.get("thumbnail_url") or row.get("ThumbnailURL"),
+    )
+
+
+def _iter_csv_rows(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Yield CSV rows as dicts straight off the spooled upload"""
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="ignore", newline="")
+    yield from csv.DictReader(text)
+
+
+def _iter_json_records(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Yield records from a JSON list or {"items": [...]} upload without loading it all"""
+    start = stream.tell()
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    stream.seek(start)
+    if first == b"[":
+        prefix = "item"
+    elif first == b"{":
+        prefix = "items.item"
+    else:
+        raise HTTPException(status_code=400, detail="Invalid JSON structure")
+
+    if ijson is not None:
+        records: Iterable[Any] = ijson.items(stream, prefix, use_float=True)
+    else:
+        payload = orjson.loads(stream.read())
+        records = payload if isinstance(payload, list) else payload.get("items") or []
+    for rec in records:
+        if not isinstance(rec, dict):
+            raise ValueError(f"expected an object per photo, got {type(rec).__name__}")
+        yield rec
+
+
+def _sample_validate(docs: Iterable[Dict[str, Any]], every: int = 1000) -> Iterator[Dict[str, Any]]:
+    # Row builders already enforce field constraints; this sample only catches drift between
+    # their output and the Photo schema
+    for i, doc in enumerate(docs):
+        if i % every == 0:
+            Photo.model_validate(doc)
+        yield doc
+
+
+def _ingest_error(status_code: int, message: Any, inserted_ids: List[str]) -> HTTPException:
+    if not inserted_ids:
+        return HTTPException(status_code=status_code, detail=message)
+    return HTTPException(
+        status_code=status_code,
+        detail={"error": message, "inserted": len(inserted_ids), "ids": inserted_ids},
+    )
+
+
+# The ingest endpoints are plain `def` so FastAPI runs their parsing and blocking
+# PyMongo calls in its worker threadpool instead of on the event loop.
 @app.post("/api/ingest/upload")
-async def ingest_upload(
+def ingest_upload(
     file: UploadFile = File(...),
     catalog: Optional[str] = Form(None),
     source: Optional[str] = Form("upload"),
 ):
-    content_type = file.content_type or ""
-    raw = await file.read()
-
-    def ensure_catalog_id(cat: Optional[str], src: Optional[str]) -> Optional[str]:
-        if not cat:
-            return None
-        existing = db["catalog"].find_one({"name": cat})
-        if existing:
-            return str(existing.get("_id"))
-        return create_document("catalog", Catalog(name=cat, source=src or "upload"))
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
 
-    catalog_id = ensure_catalog_id(catalog, source)
+    content_type = file.content_type or ""
 
-    items: List[Photo] = []
+    catalog_id = _catalog_id_for(catalog, source or "upload") if catalog else None
 
+    # Parse the upload lazily; bulk_create pulls docs through in insert-sized batches
+    dates = _date_parsers()
     if "json" in content_type or file.filename.lower().endswith(".json"):
-        try:
-            payload = json.loads(raw.decode("utf-8"))
-            if isinstance(payload, dict) and "items" in payload:
-                records = payload["items"]
-            elif isinstance(payload, list):
-                records = payload
-            else:
-                raise HTTPException(status_code=400, detail="Invalid JSON structure")
-            for rec in records:
-                # keywords may be comma-separated string
-                kws = rec.get("keywords")
-                if isinstance(kws, str):
-                    rec["keywords"] = [s.strip() for s in kws.split(",") if s.strip()]
-                exif = rec.get("exif") or {}
-                p = Photo(
-                    filename=rec.get("filename") or rec.get("name") or "",
-                    path=rec.get("path"),
-                    catalog_id=rec.get("catalog_id") or catalog_id,
-                    title=rec.get("title"),
-                    caption=rec.get("caption"),
-                    keywords=rec.get("keywords") or [],
-                    rating=_coerce_int(rec.get("rating")),
-                    label=rec.get("label"),
-                    flagged=_coerce_bool(rec.get("flagged")) or False,
-                    capture_date=_parse_date(rec.get("capture_date")),
-                    import_date=_parse_date(rec.get("import_date")) or datetime.utcnow(),
-                    width=_coerce_int(rec.get("width")),
-                    height=_coerce_int(rec.get("height")),
-                    exif={
-                        "camera": exif.get("camera"),
-                        "lens": exif.get("lens"),
-                        "iso": _coerce_int(exif.get("iso")),
-                        "aperture": _coerce_float(exif.get("aperture")),
-                        "shutter": exif.get("shutter"),
-                        "focal_length": _coerce_float(exif.get("focal_length")),
-                    },
-                    thumbnail_url=rec.get("thumbnail_url"),
-                    extra=rec.get("extra") or {},
-                )
-                items.append(p)
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"JSON parse error: {str(e)[:120]}")
-
+        docs = (_json_record_to_doc(rec, catalog_id, dates) for rec in _iter_json_records(file.file))
+        error_prefix = "JSON parse error"
     elif "csv" in content_type or file.filename.lower().endswith(".csv"):
-        try:
-            text = raw.decode("utf-8", errors="ignore")
-            reader = csv.DictReader(io.StringIO(text))
-            for row in reader:
-                kws = row.get("keywords") or row.get("Tags") or ""
-                if isinstance(kws, str):
-                    keywords = [s.strip() for s in kws.replace(";", ",").split(",") if s.strip()]
-                else:
-                    keywords = []
-                p = Photo(
-                    filename=row.get("filename") or row.get("name") or row.get("FileName") or "",
-                    path=row.get("path") or row.get("Path"),
-                    catalog_id=catalog_id,
-                    title=row.get("title") or row.get("Title"),
-                    caption=row.get("caption") or row.get("Caption"),
-                    keywords=keywords,
-                    rating=_coerce_int(row.get("rating") or row.get("Rating")),
-                    label=row.get("label") or row.get("Label"),
-                    flagged=_coerce_bool(row.get("flagged") or row.get("Flagged")) or False,
-                    capture_date=_parse_date(row.get("capture_date") or row.get("CaptureDate")),
-                    import_date=_parse_date(row.get("import_date") or row.get("ImportDate")) or datetime.utcnow(),
-                    width=_coerce_int(row.get("width") or row.get("Width")),
-                    height=_coerce_int(row.get("height") or row.get("Height")),
-                    exif={
-                        "camera": row.get("camera") or row.get("Camera"),
-                        "lens": row.get("lens") or row.get("Lens"),
-                        "iso": _coerce_int(row.get("iso") or row.get("ISO")),
-                        "aperture": _coerce_float(row.get("aperture") or row.get("Aperture")),
-                        "shutter": row.get("shutter") or row.get("Shutter"),
-                        "focal_length": _coerce_float(row.get("focal_length") or row.get("FocalLength")),
-                    },
-                    thumbnail_url=row.get("thumbnail_url") or row.get("ThumbnailURL"),
-                    extra={},
-                )
-                items.append(p)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"CSV parse error: {str(e)[:120]}")
+        docs = (_csv_row_to_doc(row, catalog_id, dates) for row in _iter_csv_rows(file.file))
+        error_prefix = "CSV parse error"
     else:
         raise HTTPException(status_code=415, detail="Unsupported file type. Use JSON or CSV.")
 
-    if not items:
+    # Batches are committed as they go, so a failure part-way through reports what was
+    # already written; retrying the whole file would otherwise duplicate those photos
+    inserted_ids: List[str] = []
+    try:
+        bulk_create("photo", _sample_validate(docs), write_concern=INGEST_WRITE_CONCERN, inserted_ids=inserted_ids)
+    except HTTPException as e:
+        raise _ingest_error(e.status_code, e.detail, inserted_ids)
+    except PyMongoError as e:
+        raise _ingest_error(500, f"Database error: {str(e)[:120]}", inserted_ids)
+    except UPLOAD_PARSE_ERRORS as e:
+        raise _ingest_error(400, f"{error_prefix}: {str(e)[:120]}", inserted_ids)
+    except Exception as e:
+        # Not the client's fault; still report what was written so a retry doesn't duplicate it
+        logger.exception("Upload ingest failed after %d inserts", len(inserted_ids))
+        if not inserted_ids:
+            raise
+        raise _ingest_error(500, f"Ingest failed: {str(e)[:120]}", inserted_ids)
+    finally:
+        # Batches before a failure are already written
+        _invalidate_facets()
+
+    if not inserted_ids:
         raise HTTPException(status_code=400, detail="No items to ingest")
 
-    inserted_ids: List[str] = []
-    for item in items:
-        data = item.model_dump()
-        new_id = create_document("photo", data)
-        inserted_ids.append(new_id)
     return {"inserted": len(inserted_ids), "ids": inserted_ids}
 
 
+def _iter_lrcat_rows(cur: Any) -> Iterator[Dict[str, Any]]:
+    """Stream catalog rows in fetchmany blocks, trying queries across LR versions"""
+    queries = [
+        # Classic fields (approximate)
+        (
+            "SELECT f.id_local AS file_id, f.baseName, f.extension, fo.pathFromRoot, i.rating, i.captureTime, i.pick, i.colorLabels, i.fileFormat "
+            "FROM AgLibraryFile f "
+            "JOIN AgLibraryFolder fo ON f.folder = fo.id_local "
+            "LEFT JOIN Adobe_images i ON i.rootFile = f.id_local"
+        ),
+        (
+            "SELECT f.id_local AS file_id, f.baseName, f.extension, fo.pathFromRoot, i.rating, i.captureTime, i.pick, i.colorLabels, NULL as fileFormat "
+            "FROM AgLibraryFile f "
+            "JOIN AgLibraryFolder fo ON f.folder = fo.id_local "
+            "LEFT JOIN Adobe_images i ON i.rootFile = f.id_local"
+        ),
+    ]
+    batch: List[Any] = []
+    for q in queries:
+        try:
+            cur.execute(q)
+            batch = cur.fetchmany()
+            break
+        except Exception:
+            continue
+
+    if not batch:
+        # fallback minimal
+        try:
+            cur.execute("SELECT id_local AS file_id, baseName, extension FROM AgLibraryFile")
+            batch = cur.fetchmany()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Unsupported Lightroom catalog structure")
+
+    colnames = [d[0] for d in cur.description]
+    while batch:
+        for r in batch:
+            yield dict(zip(colnames, r))
+        batch = cur.fetchmany()
+
+
+def _lrcat_row_to_doc(row: Dict[str, Any], catalog_id: Optional[str], dates: DateParsers) -> Dict[str, Any]:
+    base = row.get("baseName") or ""
+    ext = row.get("extension") or ""
+    path_from_root = row.get("pathFromRoot") or ""
+    name = f"{base}.{ext}" if ext else base
+    path = os.path.join(path_from_root, name) if path_from_root else (name or None)
+
+    filename = f"{base}.{ext.strip('.')}".strip('.')
+    color_labels = row.get('colorLabels')
+    return _photo_doc(
+        filename=filename or base,
+        path=path,
+        catalog_id=catalog_id,
+        rating=_coerce_rating(row.get('rating')),
+        label=None if color_labels in (None, '') else str(color_labels).split(',')[0].strip().lower(),
+        flagged=bool(_coerce_bool(row.get('pick')) or False),
+        capture_date=dates["capture_date"](row.get('captureTime')),
+        extra={"lrcat_file_id": row.get('file_id')},
+    )
+
+
 @app.post("/api/ingest/lrcat")
-async def ingest_lrcat(file: UploadFile = File(...), catalog: Optional[str] = Form(None)):
+def ingest_lrcat(file: UploadFile = File(...), catalog: Optional[str] = Form(None)):
     # Import sqlite3 lazily so environments without libsqlite don't fail at server startup
     try:
         import sqlite3  # type: ignore
@@ -263,110 +510,131 @@ async def ingest_lrcat(file: UploadFile = File(...), catalog: Optional[str] = Fo
     if not (file.filename.lower().endswith('.lrcat') or (file.content_type or '').endswith('sqlite3')):
         raise HTTPException(status_code=415, detail="Provide a Lightroom .lrcat file")
 
-    raw = await file.read()
     # Save to a temp file because sqlite3 requires a filename
     with tempfile.NamedTemporaryFile(delete=True, suffix=".sqlite") as tmp:
-        tmp.write(raw)
+        shutil.copyfileobj(file.file, tmp)
         tmp.flush()
         try:
-            conn = sqlite3.connect(tmp.name)
+            conn = sqlite3.connect(tmp.name, isolation_level=None)
             cur = conn.cursor()
+            cur.arraysize = 1000
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Could not open catalog: {str(e)[:120]}")
 
         # Create/find catalog document
         cat_name = catalog or os.path.basename(file.filename).rsplit('.', 1)[0]
-        existing = db["catalog"].find_one({"name": cat_name})
-        if existing:
-            catalog_id = str(existing.get("_id"))
-        else:
-            catalog_id = create_document("catalog", Catalog(name=cat_name, source="lightroom", path=None))
-
-        # Attempt queries across LR versions
-        rows: List[Dict[str, Any]] = []
-        queries = [
-            # Classic fields (approximate)
-            (
-                "SELECT f.id_local AS file_id, f.baseName, f.extension, fo.pathFromRoot, i.rating, i.captureTime, i.pick, i.colorLabels, i.fileFormat "
-                "FROM AgLibraryFile f "
-                "JOIN AgLibraryFolder fo ON f.folder = fo.id_local "
-                "LEFT JOIN Adobe_images i ON i.rootFile = f.id_local"
-            ),
-            (
-                "SELECT f.id_local AS file_id, f.baseName, f.extension, fo.pathFromRoot, i.rating, i.captureTime, i.pick, i.colorLabels, NULL as fileFormat "
-                "FROM AgLibraryFile f "
-                "JOIN AgLibraryFolder fo ON f.folder = fo.id_local "
-                "LEFT JOIN Adobe_images i ON i.rootFile = f.id_local"
-            ),
-        ]
-        result = None
-        for q in queries:
-            try:
-                cur.execute(q)
-                result = cur.fetchall()
-                colnames = [d[0] for d in cur.description]
-                for r in result:
-                    row = dict(zip(colnames, r))
-                    rows.append(row)
-                break
-            except Exception:
-                continue
+        catalog_id = _catalog_id_for(cat_name, "lightroom")
 
-        if not rows:
-            # fallback minimal
-            try:
-                cur.execute("SELECT id_local AS file_id, baseName, extension FROM AgLibraryFile")
-                colnames = [d[0] for d in cur.description]
-                for r in cur.fetchall():
-                    rows.append(dict(zip(colnames, r)))
-            except Exception:
-                raise HTTPException(status_code=400, detail="Unsupported Lightroom catalog structure")
-        conn.close()
-
-    def build_path(row: Dict[str, Any]) -> Optional[str]:
-        base = row.get("baseName") or ""
-        ext = row.get("extension") or ""
-        path_from_root = row.get("pathFromRoot") or ""
-        name = f"{base}.{ext}" if ext else base
-        if path_from_root:
-            return os.path.join(path_from_root, name)
-        return name or None
-
-    inserted_ids: List[str] = []
-    for row in rows:
-        filename = f"{(row.get('baseName') or '')}.{(row.get('extension') or '').strip('.')}".strip('.')
-        p = Photo(
-            filename=filename or (row.get('baseName') or ''),
-            path=build_path(row),
-            catalog_id=catalog_id,
-            title=None,
-            caption=None,
-            keywords=[],
-            rating=_coerce_int(row.get('rating')),
-            label=None if row.get('colorLabels') in (None, '') else str(row.get('colorLabels')).split(',')[0].strip().lower(),
-            flagged=bool(_coerce_bool(row.get('pick')) or False),
-            capture_date=_parse_date(row.get('captureTime')),
-            import_date=datetime.utcnow(),
-            width=None,
-            height=None,
-            exif={
-                "camera": None,
-                "lens": None,
-                "iso": None,
-                "aperture": None,
-                "shutter": None,
-                "focal_length": None,
-            },
-            thumbnail_url=None,
-            extra={"lrcat_file_id": row.get('file_id')}
-        )
-        new_id = create_document("photo", p.model_dump())
-        inserted_ids.append(new_id)
+        # Rows flow from sqlite into insert_many a block at a time; nothing is buffered whole
+        try:
+            dates = _date_parsers()
+            docs = (_lrcat_row_to_doc(row, catalog_id, dates) for row in _iter_lrcat_rows(cur))
+            inserted_ids = bulk_create("photo", _sample_validate(docs), write_concern=INGEST_WRITE_CONCERN)
+        finally:
+            conn.close()
+            _invalidate_facets()
 
     return {"inserted": len(inserted_ids), "ids": inserted_ids, "catalog": cat_name}
 
 # -------- Search endpoints --------
 
+PHOTO_INDEXES: List[IndexModel] = [
+    IndexModel([("filename", TEXT), ("title", TEXT), ("caption", TEXT), ("keywords", TEXT)], name="photo_text"),
+    # Serves the default sort and covers the card projection, so card pages filtered only on
+    # indexed fields (or not at all) can be answered from the index alone
+    IndexModel(
+        [("import_date", DESCENDING), ("_id", DESCENDING), ("filename", ASCENDING),
+         ("thumbnail_url", ASCENDING), ("rating", ASCENDING), ("label_lc", ASCENDING)],
+        name="photo_cards",
+    ),
+    # Equality filters first, then the import_date sort key so results come back pre-sorted
+    IndexModel([("flagged", ASCENDING), ("rating", DESCENDING), ("import_date", DESCENDING)]),
+    IndexModel([("exif.camera", ASCENDING), ("import_date", DESCENDING)]),
+    IndexModel([("exif.lens", ASCENDING), ("import_date", DESCENDING)]),
+    IndexModel([("label_lc", ASCENDING), ("import_date", DESCENDING)]),
+    IndexModel([("catalog_id", ASCENDING), ("import_date", DESCENDING)]),
+    IndexModel([("exif.iso", ASCENDING), ("import_date", DESCENDING)]),
+    IndexModel([("keywords_lc", ASCENDING)]),
+    # Only picks are indexed, so the common flagged=true browse walks a small, cache-resident index
+    IndexModel(
+        [("import_date", DESCENDING), ("_id", DESCENDING)],
+        name="flagged_picks",
+        partialFilterExpression={"flagged": True},
+    ),
+]
+
+CATALOG_INDEXES: List[IndexModel] = [
+    # Makes the by-name lookup an index seek and keeps concurrent upserts from creating duplicates
+    IndexModel([("name", ASCENDING)], unique=True),
+]
+
+@app.on_event("startup")
+def prepare_database():
+    if db is None:
+        return
+    # Reuse the connection check database.py made at import instead of waiting on each call below
+    if not db_reachable:
+        logger.warning("Skipping index setup and backfills: database was unreachable at startup")
+        return
+    ensure_indexes()
+    backfill_label_lc()
+    backfill_keywords_lc()
+
+
+def ensure_indexes():
+    for collection, indexes in (("photo", PHOTO_INDEXES), ("catalog", CATALOG_INDEXES)):
+        try:
+            db[collection].create_indexes(indexes)
+        except Exception as e:
+            logger.warning("Could not create %s indexes: %s", collection, e)
+
+
+def backfill_label_lc():
+    # Photos ingested before label_lc existed would otherwise never match a label filter
+    try:
+        db["photo"].update_many(
+            {"label_lc": {"$exists": False}, "label": {"$type": "string"}},
+            [{"$set": {"label_lc": {"$toLower": {"$trim": {"input": "$label"}}}}}],
+        )
+    except Exception as e:
+        logger.warning("label_lc backfill failed: %s", e)
+
+
+def backfill_keywords_lc():
+    # Photos ingested before keywords_lc existed would otherwise never match a #tag search
+    try:
+        db["photo"].update_many(
+            {"keywords_lc": {"$exists": False}},
+            # Stored keywords were validated as List[str] by Photo, so every element is a string
+            [{"$set": {"keywords_lc": {"$map": {
+                "input": {"$ifNull": ["$keywords", []]},
+                "as": "kw",
+                "in": {"$toLower": "$$kw"},
+            }}}}],
+        )
+    except Exception as e:
+        logger.warning("keywords backfill failed: %s", e)
+
+
+@functools.lru_cache(maxsize=256)
+def _prefix_pattern(value: str) -> Optional[str]:
+    # Escaped so user text is matched literally; anchored and case-sensitive so MongoDB can bound an index scan
+    stripped = value.strip().lstrip('^')
+    # A bare "^" would match every document, so an empty value means no filter
+    return f"^{re.escape(stripped)}" if stripped else None
+
+
+def _prefix_clause(value: str) -> Optional[Dict[str, Any]]:
+    pattern = _prefix_pattern(value)
+    return {"$regex": pattern} if pattern else None
+
+
+def _text_fallback_clauses(text: str) -> List[Dict[str, Any]]:
+    # Pre-$text behaviour: case-insensitive contains across the text fields (unindexed, but correct)
+    regex = {"$regex": re.escape(text), "$options": "i"}
+    return [{"filename": regex}, {"title": regex}, {"caption": regex}, {"keywords": regex}]
+
+
 def build_search_query(
     q: Optional[str] = None,
     rating: Optional[int] = None,
@@ -380,33 +648,47 @@ def build_search_query(
     max_capture_date: Optional[str] = None,
     min_import_date: Optional[str] = None,
     max_import_date: Optional[str] = None,
+    prefix: bool = False,
 ) -> Dict[str, Any]:
     query: Dict[str, Any] = {}
 
-    # Free text across common fields
-    if q:
-        regex = {"$regex": q, "$options": "i"}
-        query["$or"] = [
-            {"filename": regex},
-            {"title": regex},
-            {"caption": regex},
-            {"keywords": regex},
-        ]
+    # "#tag" tokens are exact keyword matches; the rest is free text across common fields
+    tokens = q.split() if q else []
+    tags = [t[1:].lower() for t in tokens if t.startswith("#") and len(t) > 1]
+    text = " ".join(t for t in tokens if not t.startswith("#"))
+
+    if tags:
+        query["keywords_lc"] = {"$in": tags} if len(tags) == 1 else {"$all": tags}
+
+    if text:
+        if prefix:
+            regex = _prefix_clause(text)
+            if regex:
+                query["$or"] = [
+                    {"filename": regex},
+                    {"title": regex},
+                    {"caption": regex},
+                    {"keywords": regex},
+                ]
+        else:
+            query["$text"] = {"$search": text}
 
     if rating is not None:
         query["rating"] = rating
 
     if label:
-        query["label"] = {"$regex": f"^{label}$", "$options": "i"}
+        query["label_lc"] = label.strip().lower()
 
     if flagged is not None:
         query["flagged"] = flagged
 
-    if camera:
-        query["exif.camera"] = {"$regex": camera, "$options": "i"}
+    camera_clause = _prefix_clause(camera) if camera else None
+    if camera_clause:
+        query["exif.camera"] = camera_clause
 
-    if lens:
-        query["exif.lens"] = {"$regex": lens, "$options": "i"}
+    lens_clause = _prefix_clause(lens) if lens else None
+    if lens_clause:
+        query["exif.lens"] = lens_clause
 
     iso_clause: Dict[str, Any] = {}
     if min_iso is not None:
@@ -436,13 +718,39 @@ def build_search_query(
 
     return query
 
+# Fields a result-grid card needs; all of them live in the photo_cards index, so a card find can be covered
+CARD_PROJECTION = {"_id": 1, "filename": 1, "thumbnail_url": 1, "rating": 1, "import_date": 1, "label_lc": 1}
+
 class SearchResponse(BaseModel):
     total: int
     items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+def _encode_cursor(doc: Dict[str, Any]) -> Optional[str]:
+    import_date = doc.get("import_date")
+    if not isinstance(import_date, datetime):
+        return None
+    return f"{import_date.isoformat()}_{doc['id']}"
+
+
+def _decode_cursor(after: str) -> Dict[str, Any]:
+    """Turn an _encode_cursor token into a filter for the rows that sort after it"""
+    try:
+        date_part, id_part = after.rsplit("_", 1)
+        import_date = datetime.fromisoformat(date_part)
+        oid = ObjectId(id_part)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"import_date": {"$lt": import_date}},
+        {"import_date": import_date, "_id": {"$lt": oid}},
+    ]}
 
 @app.get("/api/search", response_model=SearchResponse)
 def search_photos(
     q: Optional[str] = Query(None, description="Free-text search"),
+    prefix: bool = Query(False, description="Match q as a case-sensitive prefix instead of full-text search"),
     rating: Optional[int] = Query(None, ge=0, le=5),
     label: Optional[str] = None,
     flagged: Optional[bool] = None,
@@ -456,25 +764,73 @@ def search_photos(
     max_import_date: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(40, ge=1, le=200),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page; when set, page is ignored and total counts the remaining results"),
+    mode: Literal["full", "card"] = Query("full", description="card returns only the fields needed for a results grid"),
 ):
-    query = build_search_query(q, rating, label, flagged, camera, lens, min_iso, max_iso, min_capture_date, max_capture_date, min_import_date, max_import_date)
+    query = build_search_query(q, rating, label, flagged, camera, lens, min_iso, max_iso, min_capture_date, max_capture_date, min_import_date, max_import_date, prefix)
 
-    total = db["photo"].count_documents(query)
+    # Keyset pagination: seek past the last row of the previous page instead of skipping
+    if after:
+        query["$and"] = query.get("$and", []) + [_decode_cursor(after)]
+        skip = 0
+    else:
+        skip = (page - 1) * page_size
 
-    cursor = (
-        db["photo"]
-        .find(query, {"extra": 0})
-        .sort([("import_date", -1)])
-        .skip((page - 1) * page_size)
-        .limit(page_size)
-    )
+    sort_stage = {"$sort": {"import_date": -1, "_id": -1}}
+    page_stages = [
+        {"$skip": skip},
+        {"$limit": page_size},
+        {"$project": {"extra": 0}},
+    ]
+
+    def run(query: Dict[str, Any]):
+        if mode == "card":
+            # A plain find with a projection can be planned as a covered query; an aggregate can't
+            total = db["photo"].count_documents(query) if query else db["photo"].estimated_document_count()
+            cursor = (
+                db["photo"].find(query, CARD_PROJECTION, allow_disk_use=True)
+                .sort([("import_date", DESCENDING), ("_id", DESCENDING)])
+                .skip(skip)
+                .limit(page_size)
+            )
+            return total, list(cursor)
+        if not query:
+            # Unfiltered browse: the collection metadata already knows the total
+            total = db["photo"].estimated_document_count()
+            docs = list(db["photo"].aggregate([sort_stage, *page_stages]))
+            return total, docs
+        # Count and page in a single pass over the matched set
+        pipeline = [
+            {"$match": query},
+            sort_stage,
+            {"$facet": {
+                "total": [{"$count": "n"}],
+                "items": page_stages,
+            }},
+        ]
+        # The $sort can't fold into the $limit inside $facet, so filters no index sorts (e.g. $text)
+        # sort every match; allow spilling to disk rather than failing on the 100 MB sort limit
+        result = next(db["photo"].aggregate(pipeline, allowDiskUse=True), None) or {"total": [], "items": []}
+        total = result["total"][0]["n"] if result["total"] else 0
+        return total, result["items"]
+
+    try:
+        total, docs = run(query)
+    except OperationFailure as e:
+        # 27 = IndexNotFound: photo_text is missing (e.g. it failed to build at startup)
+        if e.code != 27 or "$text" not in query:
+            raise
+        logger.warning("photo_text index missing, falling back to regex search")
+        query["$or"] = _text_fallback_clauses(query.pop("$text")["$search"])
+        total, docs = run(query)
 
     def serialize(doc: Dict[str, Any]) -> Dict[str, Any]:
         doc["id"] = str(doc.pop("_id"))
         return doc
 
-    items = [serialize(d) for d in cursor]
-    return SearchResponse(total=total, items=items)
+    items = [serialize(d) for d in docs]
+    next_cursor = _encode_cursor(items[-1]) if len(items) == page_size else None
+    return SearchResponse(total=total, items=items, next_cursor=next_cursor)
 
 @app.get("/api/photos/{photo_id}")
 def get_photo(photo_id: str):
@@ -506,11 +862,18 @@ def get_facets():
             "lenses": 1,
         }}
     ]
+    if _facet_cache["data"] is not None and time.monotonic() - _facet_cache["ts"] < FACET_CACHE_TTL:
+        return _facet_cache["data"]
+    gen = _facet_cache["gen"]
     try:
         agg = list(db["photo"].aggregate(pipeline))
-        return agg[0] if agg else {"ratings": [], "labels": [], "cameras": [], "lenses": []}
+        data = agg[0] if agg else {"ratings": [], "labels": [], "cameras": [], "lenses": []}
     except Exception:
         return {"ratings": [], "labels": [], "cameras": [], "lenses": []}
+    if _facet_cache["gen"] == gen:
+        _facet_cache["data"] = data
+        _facet_cache["ts"] = time.monotonic()
+    return data
 
 if __name__ == "__main__":
     import uvicorn